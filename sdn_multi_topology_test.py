@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 
 from mininet.net import Mininet
-from mininet.node import RemoteController, OVSSwitch
+from mininet.node import OVSSwitch
 from mininet.cli import CLI
 from mininet.log import setLogLevel, info
+from abc import ABC, abstractmethod
 import time
 import argparse
 import yaml
@@ -11,6 +12,11 @@ import os
 import subprocess
 import atexit
 import glob
+import re
+import shlex
+import shutil
+import signal
+import socket
 
 def generate_universal_working_config(num_switches, hosts_per_switch):
     """
@@ -60,59 +66,255 @@ def generate_universal_working_config(num_switches, hosts_per_switch):
     
     return config
 
-def start_faucet_controller(config_file):
-    """Start Faucet controller using Docker with specified config"""
+def get_switch_shard(switch_num, num_switches, num_shards):
+    """Assign switch (1-indexed) to a controller shard - contiguous, evenly sized blocks"""
+    return (switch_num - 1) * num_shards // num_switches
+
+def shard_faucet_config(config, num_shards):
+    """
+    Split a universal Faucet config across num_shards controller instances
     
-    info('*** Starting Faucet controller with Docker...\n')
+    Every DP is an independent L2 switch on the same flooded VLAN, so each shard only
+    needs the shared VLANs plus its own DPs. Returns a list of per-shard configs.
+    """
+    num_switches = len(config['dps'])
+    shards = [{'vlans': config['vlans'], 'dps': {}} for _ in range(num_shards)]
     
-    # Cleanup any existing containers
-    try:
-        subprocess.run(['docker', 'stop', 'universal-faucet'], check=False, capture_output=True)
-        subprocess.run(['docker', 'rm', 'universal-faucet'], check=False, capture_output=True)
-        time.sleep(2)
-    except:
+    for dp_name, dp in config['dps'].items():
+        shard = get_switch_shard(dp['dp_id'], num_switches, num_shards)
+        shards[shard]['dps'][dp_name] = dp
+    
+    return shards
+
+# Pinned image so runs are reproducible and never silently pull a new :latest
+# Keep in sync with docker-compose.yml
+FAUCET_DOCKER_IMAGE = 'faucet/faucet:1.10.11'
+OPENFLOW13_HELLO = b'\x04\x00\x00\x08\x00\x00\x00\x01'
+
+class FaucetBackend(ABC):
+    """
+    Base Faucet controller backend
+    Subclasses implement start/stop/is_running/get_logs; readiness and log capture are shared
+    """
+    
+    kind = None
+    
+    def __init__(self, config_file, name='universal-faucet', port=6653, prometheus_port=9302):
+        self.config_file = os.path.abspath(config_file)
+        self.name = name
+        self.port = port
+        self.prometheus_port = prometheus_port
+    
+    @abstractmethod
+    def start(self):
         pass
     
-    # Start Faucet with the generated configuration
-    cmd = [
-        'docker', 'run', '-d',
-        '--name', 'universal-faucet',
-        '-p', '6653:6653',
-        '-v', f'{os.path.abspath(config_file)}:/etc/faucet/faucet.yaml',
-        'faucet/faucet:latest'
-    ]
+    @abstractmethod
+    def stop(self):
+        pass
     
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        atexit.register(stop_faucet_controller)
+    @abstractmethod
+    def is_running(self):
+        pass
+    
+    @abstractmethod
+    def get_logs(self):
+        pass
+    
+    def wait_until_ready(self, timeout=30, interval=0.1):
+        """
+        Wait until the controller answers an OpenFlow HELLO on its port
+        A bare TCP connect is not enough: docker-proxy accepts before Faucet is listening
+        Returns (ready, elapsed)
+        """
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            if not self.is_running():
+                break
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=1) as sock:
+                    sock.sendall(OPENFLOW13_HELLO)
+                    reply = sock.recv(8)
+                    if len(reply) >= 2 and reply[1] == 0:  # OFPT_HELLO
+                        return True, time.time() - start_time
+            except OSError:
+                pass
+            time.sleep(interval)
+        return False, time.time() - start_time
+    
+    def launch(self, timeout=30):
+        """Start the controller, wait for readiness and dump logs on failure"""
+        info(f'*** Starting Faucet controller ({self.kind}) {self.name} on port {self.port}...\n')
+        if not self.start():
+            return False
+        
+        ready, elapsed = self.wait_until_ready(timeout)
+        if ready:
+            info(f'*** Faucet controller {self.name} ready in {elapsed:.2f}s\n')
+            return True
+        
+        info(f'*** Faucet {self.name} failed to start. Logs:\n{self.get_logs()}\n')
+        self.stop()
+        return False
+
+class DockerFaucetBackend(FaucetBackend):
+    """Faucet running in a Docker container from a pinned image"""
+    
+    kind = 'docker'
+    
+    def __init__(self, config_file, image=FAUCET_DOCKER_IMAGE, **kwargs):
+        super().__init__(config_file, **kwargs)
+        self.image = image
+    
+    def start(self):
+        # Cleanup any existing container with the same name
+        self.stop()
+        
+        cmd = [
+            'docker', 'run', '-d',
+            '--name', self.name,
+            '-p', f'{self.port}:6653',
+            '-v', f'{self.config_file}:/etc/faucet/faucet.yaml',
+            self.image
+        ]
         
-        # Wait for Faucet to start
-        time.sleep(10)
+        try:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+            return True
+        except (OSError, subprocess.CalledProcessError) as e:
+            info(f'*** Error starting Faucet container: {e}\n')
+            return False
+    
+    def stop(self):
+        try:
+            subprocess.run(['docker', 'stop', self.name], check=False, capture_output=True)
+            subprocess.run(['docker', 'rm', self.name], check=False, capture_output=True)
+        except OSError:
+            pass
+    
+    def is_running(self):
+        check_cmd = ['docker', 'ps', '--filter', f'name=^{self.name}$', '--format', '{{.Status}}']
+        try:
+            check_result = subprocess.run(check_cmd, capture_output=True, text=True)
+        except OSError:
+            return False
+        return 'Up' in check_result.stdout
+    
+    def get_logs(self):
+        try:
+            logs_result = subprocess.run(['docker', 'logs', self.name], capture_output=True, text=True)
+            return f'{logs_result.stdout}\n{logs_result.stderr}'
+        except OSError as e:
+            return f'Error reading container logs: {e}'
+
+class NativeFaucetBackend(FaucetBackend):
+    """
+    Locally installed Faucet run as a child process - no Docker or network needed
+    Pass a command prefix (e.g. ['py-spy', 'record', '-o', 'faucet-{name}.svg', '--', 'faucet']) to profile it,
+    exposed on the command line as --controller-command. {name} and {port} are substituted per instance.
+    
+    The process runs in its own session so Ctrl-C in the Mininet CLI does not reach it, and
+    stop() signals the whole process group so wrapped faucet children never outlive it.
+    """
+    
+    kind = 'native'
+    
+    def __init__(self, config_file, command=None, log_dir=None, **kwargs):
+        super().__init__(config_file, **kwargs)
+        self.command = [arg.format(name=self.name, port=self.port) for arg in (command or ['faucet'])]
+        self.log_dir = os.path.abspath(log_dir or f'faucet_logs/{self.name}')
+        self.process = None
+        self.stdout_file = None
+    
+    def start(self):
+        self.stop()
         
-        # Check if container is running
-        check_cmd = ['docker', 'ps', '--filter', 'name=universal-faucet', '--format', '{{.Status}}']
-        check_result = subprocess.run(check_cmd, capture_output=True, text=True)
+        if not shutil.which(self.command[0]):
+            info(f'*** Error: {self.command[0]} not found in PATH (pip install faucet)\n')
+            return False
+        
+        os.makedirs(self.log_dir, exist_ok=True)
+        env = dict(os.environ,
+                   FAUCET_CONFIG=self.config_file,
+                   FAUCET_LOG=os.path.join(self.log_dir, 'faucet.log'),
+                   FAUCET_EXCEPTION_LOG=os.path.join(self.log_dir, 'faucet_exception.log'),
+                   FAUCET_PROMETHEUS_PORT=str(self.prometheus_port))
+        cmd = self.command + [f'--ryu-ofp-tcp-listen-port={self.port}']
         
-        if 'Up' in check_result.stdout:
-            info('*** Faucet controller started successfully\n')
+        try:
+            self.stdout_file = open(os.path.join(self.log_dir, 'faucet_stdout.log'), 'w')
+            self.process = subprocess.Popen(cmd, env=env, stdout=self.stdout_file,
+                                            stderr=subprocess.STDOUT, start_new_session=True)
+            info(f'*** Faucet {self.name} running as pid {self.process.pid}\n')
             return True
-        else:
-            logs_cmd = ['docker', 'logs', 'universal-faucet']
-            logs_result = subprocess.run(logs_cmd, capture_output=True, text=True)
-            info(f'*** Faucet failed to start. Logs:\n{logs_result.stdout}\n{logs_result.stderr}\n')
+        except OSError as e:
+            info(f'*** Error starting Faucet process: {e}\n')
             return False
-            
-    except subprocess.CalledProcessError as e:
-        info(f'*** Error starting Faucet container: {e}\n')
+    
+    def signal_group(self, sig):
+        """Send sig to the process group; returns False once the group is gone"""
+        try:
+            os.killpg(self.process.pid, sig)
+            return True
+        except ProcessLookupError:
+            return False
+    
+    def wait_for_group(self, timeout):
+        """Wait until every process in the group has exited"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.process.poll()  # Reap the leader so its zombie does not keep the group alive
+            if not self.signal_group(0):
+                return True
+            time.sleep(0.1)
         return False
+    
+    def stop(self):
+        if self.process is not None:
+            # SIGINT first so profilers like py-spy flush their output, then escalate
+            for sig in [signal.SIGINT, signal.SIGTERM, signal.SIGKILL]:
+                if not self.signal_group(sig) or self.wait_for_group(timeout=5):
+                    break
+            self.process.poll()
+        self.process = None
+        if self.stdout_file is not None:
+            self.stdout_file.close()
+            self.stdout_file = None
+    
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+    
+    def get_logs(self):
+        logs = []
+        for log_name in ['faucet_stdout.log', 'faucet.log', 'faucet_exception.log']:
+            log_path = os.path.join(self.log_dir, log_name)
+            if os.path.exists(log_path):
+                with open(log_path) as f:
+                    logs.append(f'--- {log_name} ---\n{f.read()}')
+        return '\n'.join(logs)
+
+CONTROLLER_BACKENDS = {
+    'docker': DockerFaucetBackend,
+    'native': NativeFaucetBackend
+}
+
+# Controllers started by start_faucet_controller, stopped by stop_faucet_controller
+active_controllers = []
+
+def start_faucet_controller(config_file, backend='docker', **kwargs):
+    """Start Faucet controller with specified config using the chosen backend"""
+    
+    controller = CONTROLLER_BACKENDS[backend](config_file, **kwargs)
+    active_controllers.append(controller)
+    
+    return controller.launch()
 
 def stop_faucet_controller():
-    """Stop Faucet controller container"""
-    try:
-        subprocess.run(['docker', 'stop', 'universal-faucet'], check=False, capture_output=True)
-        subprocess.run(['docker', 'rm', 'universal-faucet'], check=False, capture_output=True)
-    except:
-        pass
+    """Stop all running Faucet controllers"""
+    while active_controllers:
+        active_controllers.pop().stop()
+
+atexit.register(stop_faucet_controller)
 
 def create_hosts_universal(net, switches, num_switches, hosts_per_switch):
     """Create hosts using the PROVEN WORKING PATTERN - all in same subnet"""
@@ -338,15 +540,19 @@ def check_flows_installed(switch, min_flows=1):
     except Exception as e:
         return False, 0, [f"Error: {e}"]
 
-def wait_for_flows_installed(switches, max_wait_time=120, check_interval=3):
+def wait_for_flows_installed(switches, max_wait_time=120, check_interval=3, start_time=None):
     """
     Wait for flows to be installed on all switches
+    start_time defaults to now; pass the time switches were pointed at their controller
+    Switches are polled one after another, so each status records the duration of the sweep
+    that detected it - detection times are only accurate to within that sweep
     Returns (success, total_time, switch_status)
     """
     
     info(f'*** Programmatic flow detection: checking {len(switches)} switches every {check_interval}s\n')
     
-    start_time = time.time()
+    if start_time is None:
+        start_time = time.time()
     switch_status = {}
     
     while time.time() - start_time < max_wait_time:
@@ -354,6 +560,8 @@ def wait_for_flows_installed(switches, max_wait_time=120, check_interval=3):
         
         all_switches_ready = True
         switches_with_flows = 0
+        sweep_start = time.time()
+        swept = []
         
         for i, switch in enumerate(switches):
             switch_name = f"SW{i+1}"
@@ -365,8 +573,9 @@ def wait_for_flows_installed(switches, max_wait_time=120, check_interval=3):
                     'ready': flows_installed,
                     'flow_count': flow_count,
                     'sample_flows': sample_flows,
-                    'check_time': elapsed
+                    'check_time': time.time() - start_time  # When this switch was detected
                 }
+                swept.append(switch_name)
                 
                 if flows_installed:
                     info(f'*** {switch_name}: {flow_count} flows installed at {elapsed:.1f}s\n')
@@ -377,6 +586,10 @@ def wait_for_flows_installed(switches, max_wait_time=120, check_interval=3):
                 # Already ready
                 switches_with_flows += 1
         
+        sweep_duration = time.time() - sweep_start
+        for switch_name in swept:
+            switch_status[switch_name]['sweep_duration'] = sweep_duration
+        
         if elapsed > 0 and elapsed % 10 == 0:  # Progress update every 10s
             info(f'*** Flow detection progress: {switches_with_flows}/{len(switches)} switches ready at {elapsed:.1f}s\n')
         
@@ -392,11 +605,162 @@ def wait_for_flows_installed(switches, max_wait_time=120, check_interval=3):
     total_time = time.time() - start_time
     return False, total_time, switch_status
 
-def universal_sdn_test(topology_type='star', num_switches=3, hosts_per_switch=2, skip_cli=False):
+def get_shard_stats(config, switch_status, shard_ports):
+    """
+    Summarise controller load per shard from the flow detection results
+    shard_ports lists the OpenFlow port of each shard's controller
+    Returns list of dicts with switches, ports, installed flows, shard convergence time and
+    the polling sweep duration bounding its error
+    """
+    num_switches = len(config['dps'])
+    num_shards = len(shard_ports)
+    shard_stats = [{'shard': shard, 'port': port, 'switches': 0, 'ports': 0,
+                    'flows': 0, 'ready': 0, 'convergence_time': 0.0, 'sweep_duration': 0.0}
+                   for shard, port in enumerate(shard_ports)]
+    
+    for dp in config['dps'].values():
+        stats = shard_stats[get_switch_shard(dp['dp_id'], num_switches, num_shards)]
+        stats['switches'] += 1
+        stats['ports'] += len(dp['interfaces'])
+        
+        status = switch_status.get(f"SW{dp['dp_id']}")
+        if status:
+            stats['flows'] += status['flow_count']
+            if status['ready']:
+                stats['ready'] += 1
+                stats['convergence_time'] = max(stats['convergence_time'], status['check_time'])
+                stats['sweep_duration'] = max(stats['sweep_duration'], status['sweep_duration'])
+    
+    return shard_stats
+
+def print_shard_stats(shard_stats):
+    """Display per-shard controller load"""
+    print("\n=== CONTROLLER SHARD LOAD ===")
+    for stats in shard_stats:
+        print(f"Shard {stats['shard']} (port {stats['port']}): "
+              f"{stats['ready']}/{stats['switches']} switches ready, {stats['ports']} ports, "
+              f"{stats['flows']} flows, converged at {stats['convergence_time']:.2f}s "
+              f"(±{stats['sweep_duration']:.2f}s polling sweep)")
+
+def print_shard_comparison(baseline, sharded):
+    """Compare flow installation time of a sharded run against the single-controller baseline"""
+    print("\n📊 CONTROLLER SHARDING vs SINGLE CONTROLLER:")
+    print("=" * 40)
+    for run in [baseline, sharded]:
+        status = "✅" if run['flows_installed'] else "❌"
+        print(f"{run['controller_shards']:>3} controller(s): flows installed in "
+              f"{run['flow_install_time']:>5.2f}s (±{run['flow_sweep_duration']:.2f}s polling sweep) "
+              f"{status}, {run['success_rate']:.1f}% connectivity")
+    
+    if not (baseline['flows_installed'] and sharded['flows_installed']):
+        print("Convergence speedup not reported: flows missing in at least one run")
+    elif sharded['flow_install_time'] > 0:
+        speedup = baseline['flow_install_time'] / sharded['flow_install_time']
+        print(f"Convergence speedup with {sharded['controller_shards']} shards: {speedup:.2f}x")
+
+def sample_datapath_stats():
+    """
+    Sample kernel datapath statistics below the OpenFlow tables
+    Returns dict with lookup, megaflow mask and datapath flow counters summed over all datapaths
+    """
+    stats = {
+        'lookups_hit': 0,
+        'lookups_missed': 0,
+        'lookups_lost': 0,
+        'flows': 0,
+        'masks_hit': 0,
+        'masks_total': 0,
+        'upcall_flows': 0,
+        'upcall_flow_limit': 0,
+        'available': False
+    }
+    
+    try:
+        # All Mininet OVS bridges share the ovs-system kernel datapath
+        dp_output = subprocess.run(['ovs-dpctl', 'show'], capture_output=True, text=True).stdout
+        
+        for match in re.finditer(r'lookups: hit:(\d+) missed:(\d+) lost:(\d+)', dp_output):
+            stats['lookups_hit'] += int(match.group(1))
+            stats['lookups_missed'] += int(match.group(2))  # Misses queued to userspace
+            stats['lookups_lost'] += int(match.group(3))  # Misses whose upcall failed (not in missed)
+            stats['available'] = True
+        
+        for match in re.finditer(r'^\s*flows: (\d+)', dp_output, re.MULTILINE):
+            stats['flows'] += int(match.group(1))
+        
+        for match in re.finditer(r'masks: hit:(\d+) total:(\d+)', dp_output):
+            stats['masks_hit'] += int(match.group(1))
+            stats['masks_total'] += int(match.group(2))
+        
+        # Revalidator view of the megaflow cache at sample time
+        upcall_output = subprocess.run(['ovs-appctl', 'upcall/show'], capture_output=True, text=True).stdout
+        for match in re.finditer(r'flows\s*:\s*\(current (\d+)\).*\(limit (\d+)\)', upcall_output):
+            stats['upcall_flows'] += int(match.group(1))
+            stats['upcall_flow_limit'] = max(stats['upcall_flow_limit'], int(match.group(2)))
+            
+    except Exception as e:
+        info(f'*** Warning: Datapath stats sampling failed: {e}\n')
+    
+    return stats
+
+def diff_datapath_stats(before, after):
+    """
+    Compute datapath cache efficiency for a traffic phase from two samples
+    Returns dict with deltas, megaflow hit rate and average masks probed per packet
+    """
+    hit = after['lookups_hit'] - before['lookups_hit']
+    missed = after['lookups_missed'] - before['lookups_missed']
+    lost = after['lookups_lost'] - before['lookups_lost']
+    masks_hit = after['masks_hit'] - before['masks_hit']
+    packets = hit + missed + lost  # lost misses are not counted in missed
+    
+    return {
+        'packets': packets,
+        'lookups_hit': hit,
+        'lookups_missed': missed,
+        'lookups_lost': lost,
+        'upcalls': missed + lost,  # Upcall attempts, including failed ones
+        'megaflow_hit_rate': (100.0 * hit / packets) if packets else 0.0,
+        'masks_hit_per_pkt': (masks_hit / packets) if packets else 0.0,
+        'flows': after['flows'],  # Datapath flows at end of phase
+        'masks_total': after['masks_total'],
+        'upcall_flows': after['upcall_flows'],  # Revalidator flows at end of phase
+        'upcall_flow_limit': after['upcall_flow_limit'],
+        'available': before['available'] and after['available']
+    }
+
+def print_datapath_stats(phase_stats):
+    """Display per-phase datapath cache efficiency"""
+    print("\n=== DATAPATH CACHE EFFICIENCY ===")
+    for phase, stats in phase_stats.items():
+        if not stats['available']:
+            print(f"{phase:>12}: datapath stats unavailable (ovs-dpctl failed)")
+            continue
+        print(f"{phase:>12}: {stats['packets']} pkts, "
+              f"megaflow hit rate {stats['megaflow_hit_rate']:.1f}%, "
+              f"upcalls {stats['upcalls']} (lost {stats['lookups_lost']}), "
+              f"masks {stats['masks_total']} ({stats['masks_hit_per_pkt']:.2f} hit/pkt), "
+              f"dp flows {stats['flows']} (revalidator {stats['upcall_flows']}/{stats['upcall_flow_limit']})")
+
+def universal_sdn_test(topology_type='star', num_switches=3, hosts_per_switch=2, skip_cli=False,
+                       datapath_stats=False, results=None, controller_backend='docker',
+                       controller_shards=1, controller_command=None, flow_check_interval=3,
+                       prometheus_base_port=9402):
     """
     Universal SDN test - applies PROVEN WORKING PATTERN to all topologies
+    
+    If results dict is given it is filled with the topology, workload, flow install time,
+    success rate, per-shard controller load and (with datapath_stats) per-phase datapath
+    cache statistics. controller_shards > 1 splits the DPs across that many Faucet instances.
+    Use a small flow_check_interval when comparing convergence times between runs.
+    Shard Prometheus ports start at prometheus_base_port, clear of the 9302/9303 used by docker-compose.
     """
     
+    if controller_shards < 1 or controller_shards > num_switches:
+        raise ValueError(f"Controller shards must be between 1 and {num_switches}, got {controller_shards}")
+    if controller_command and controller_backend != 'native':
+        raise ValueError(f"Controller command requires the native backend, got {controller_backend}")
+    
     setLogLevel('info')
     
     # Clean up network interfaces from any previous tests
@@ -427,14 +791,32 @@ def universal_sdn_test(topology_type='star', num_switches=3, hosts_per_switch=2,
     info(f'*** Generated universal Faucet configuration: {config_file}\n')
     info(f'*** Validated: {actual_switches} switches configured correctly\n')
     
-    # Start Faucet controller
-    if not start_faucet_controller(config_file):
-        raise Exception("Failed to start Faucet controller")
-    
-    net = Mininet()
-    
-    info('*** Adding controller\n')
-    c0 = net.addController('c0', controller=RemoteController, ip='127.0.0.1', port=6653)
+    # Start Faucet controller(s) - each shard gets its own config, port and instance name
+    backend_kwargs = {'command': shlex.split(controller_command)} if controller_command else {}
+    shard_ports = []
+    if controller_shards == 1:
+        shard_ports.append(6653)
+        if not start_faucet_controller(config_file, backend=controller_backend, **backend_kwargs):
+            raise Exception("Failed to start Faucet controller")
+    else:
+        info(f'*** Sharding {num_switches} switches across {controller_shards} Faucet controllers\n')
+        for shard, shard_config in enumerate(shard_faucet_config(config, controller_shards)):
+            shard_file = f'universal_{topology_type}_s{num_switches}_h{hosts_per_switch}_shard{shard}_faucet.yaml'
+            with open(shard_file, 'w') as f:
+                yaml.dump(shard_config, f, default_flow_style=False)
+            info(f'*** Shard {shard}: {sorted(shard_config["dps"])} -> {shard_file}\n')
+            
+            shard_ports.append(6653 + shard)
+            if not start_faucet_controller(shard_file, backend=controller_backend,
+                                           name=f'universal-faucet-{shard}',
+                                           port=6653 + shard,
+                                           prometheus_port=prometheus_base_port + shard,
+                                           **backend_kwargs):
+                raise Exception(f"Failed to start Faucet controller for shard {shard}")
+    
+    # No default controller: each switch is pointed at its own shard's controller below,
+    # so no switch connects to the wrong Faucet instance during net.start()
+    net = Mininet(controller=None)
     
     info(f'*** Creating {topology_type} topology\n')
     # Apply working pattern to different physical topologies
@@ -455,19 +837,30 @@ def universal_sdn_test(topology_type='star', num_switches=3, hosts_per_switch=2,
     info('*** Configuring switches for SDN\n')
     # Essential SDN configuration - same as working pattern
     for switch in switches:
-        switch.cmd(f'ovs-vsctl set-controller {switch.name} tcp:127.0.0.1:6653')
         switch.cmd(f'ovs-vsctl set-fail-mode {switch.name} secure')
         switch.cmd(f'ovs-vsctl set bridge {switch.name} protocols=OpenFlow13')
         # FIXED: Increase port limit to support large topologies
         switch.cmd(f'ovs-vsctl set bridge {switch.name} other-config:max-ports=64')
         info(f'*** {switch.name}: Configured for up to 64 ports\n')
     
+    # Convergence is timed from the moment switches are pointed at their controller
+    convergence_start = time.time()
+    for i, switch in enumerate(switches):
+        controller_port = shard_ports[get_switch_shard(i + 1, num_switches, controller_shards)]
+        switch.cmd(f'ovs-vsctl set-controller {switch.name} tcp:127.0.0.1:{controller_port}')
+    
     info('*** Waiting for Faucet to install flows...\n')
     # IMPROVED: Programmatic flow detection instead of arbitrary wait
     max_wait_time = max(60, num_switches * 4)  # Conservative maximum, but usually much faster
     info(f'*** Checking for flow installation (max {max_wait_time}s timeout)\n')
     
-    success, actual_time, switch_status = wait_for_flows_installed(switches, max_wait_time)
+    success, actual_time, switch_status = wait_for_flows_installed(switches, max_wait_time,
+                                                                   check_interval=flow_check_interval,
+                                                                   start_time=convergence_start)
+    
+    phase_stats = {}
+    if datapath_stats:
+        phase_sample = sample_datapath_stats()
     
     if success:
         info(f'*** Flows installed successfully in {actual_time:.1f}s (much faster than arbitrary wait!)\n')
@@ -510,6 +903,10 @@ def universal_sdn_test(topology_type='star', num_switches=3, hosts_per_switch=2,
                 failed_switches.append(i+1)
                 flows_installed = False
     
+    shard_stats = get_shard_stats(config, switch_status, shard_ports)
+    if controller_shards > 1:
+        print_shard_stats(shard_stats)
+    
     if failed_switches:
         print(f"\n⚠️  Switches with no flows: {failed_switches}")
         print("   This may indicate controller connection or topology issues")
@@ -563,11 +960,20 @@ def universal_sdn_test(topology_type='star', num_switches=3, hosts_per_switch=2,
         print("✅ Cross-switch communication working!")
         print("✅ Proven working pattern scales to all topologies!")
     
+    if datapath_stats:
+        sample = sample_datapath_stats()
+        phase_stats['connectivity'] = diff_datapath_stats(phase_sample, sample)
+        phase_sample = sample
+    
     print("\n=== FINAL PINGALL ===")
     loss = net.pingAll(timeout='3')
     success_rate = 100 - loss
     print(f"Overall success rate: {success_rate}%")
     
+    if datapath_stats:
+        phase_stats['pingall'] = diff_datapath_stats(phase_sample, sample_datapath_stats())
+        print_datapath_stats(phase_stats)
+    
     if success_rate == 100:
         print("🏆 PERFECT SUCCESS - 100% CONNECTIVITY!")
         print(f"🎯 {topology_type.upper()} topology with {num_switches} switches and {total_hosts} hosts COMPLETE!")
@@ -578,6 +984,23 @@ def universal_sdn_test(topology_type='star', num_switches=3, hosts_per_switch=2,
     else:
         print("❌ More debugging needed")
     
+    if results is not None:
+        results.update({
+            'topology': topology_type,
+            'switches': num_switches,
+            'hosts_per_switch': hosts_per_switch,
+            'controller_backend': controller_backend,
+            'controller_shards': controller_shards,
+            'shards': shard_stats,
+            'total_hosts': total_hosts,
+            'flows_installed': flows_installed,
+            'flow_install_time': actual_time,
+            'flow_sweep_duration': max([status.get('sweep_duration', 0.0)
+                                        for status in switch_status.values()], default=0.0),
+            'success_rate': success_rate,
+            'datapath': phase_stats
+        })
+    
     if not skip_cli:
         print("\n=== ENTERING CLI ===")
         print("You can now test manually:")
@@ -627,6 +1050,18 @@ def parse_args():
                        help='Skip CLI and exit after tests')
     parser.add_argument('--test-all', action='store_true', 
                        help='Test all topology types with same parameters')
+    parser.add_argument('--datapath-stats', action='store_true',
+                       help='Sample OVS kernel datapath cache stats (megaflow hits, upcalls) per traffic phase')
+    parser.add_argument('--controller-backend', choices=sorted(CONTROLLER_BACKENDS), default='docker',
+                       help=f'Faucet backend: docker ({FAUCET_DOCKER_IMAGE}) or native local faucet process (default: docker)')
+    parser.add_argument('--controller-command',
+                       help='Native backend command, e.g. "py-spy record -o faucet-{name}.svg -- faucet" to profile; {name}/{port} are per instance (default: faucet)')
+    parser.add_argument('--controller-shards', type=int, default=1,
+                       help='Split switches across this many Faucet controller instances (default: 1)')
+    parser.add_argument('--prometheus-base-port', type=int, default=9402,
+                       help='First Prometheus port for shard controllers, one per shard (default: 9402)')
+    parser.add_argument('--shard-baseline', action='store_true',
+                       help='Also run a single-controller baseline and compare flow installation time')
     return parser.parse_args()
 
 if __name__ == '__main__':
@@ -649,6 +1084,21 @@ if __name__ == '__main__':
     if args.topology == 'linear' and args.switches < 2:
         print("Error: Linear topology requires at least 2 switches")
         exit(1)
+    if args.controller_command and args.controller_backend != 'native':
+        print("Error: --controller-command requires --controller-backend native")
+        exit(1)
+    if args.controller_shards < 1 or args.controller_shards > args.switches:
+        print("Error: Controller shards must be between 1 and the number of switches")
+        exit(1)
+    if args.shard_baseline and args.controller_shards < 2:
+        print("Error: --shard-baseline requires --controller-shards of at least 2")
+        exit(1)
+    if args.shard_baseline and args.test_all:
+        print("Error: --shard-baseline is not supported with --test-all")
+        exit(1)
+    
+    # Fine-grained flow polling so sharded and baseline convergence times are comparable
+    flow_check_interval = 0.2 if args.controller_shards > 1 else 3
     
     total_hosts = args.switches * args.hosts
     
@@ -658,13 +1108,22 @@ if __name__ == '__main__':
         
         topologies = ['star', 'mesh', 'tree', 'linear']
         results = {}
+        run_results = {}
         
         for topology in topologies:
             print(f"\n🔬 Testing {topology.upper()} topology...")
             print(f"   Switches: {args.switches}, Hosts per switch: {args.hosts}")
             
             try:
-                success_rate = universal_sdn_test(topology, args.switches, args.hosts, skip_cli=True)
+                run_results[topology] = {}
+                success_rate = universal_sdn_test(topology, args.switches, args.hosts, skip_cli=True,
+                                                  datapath_stats=args.datapath_stats,
+                                                  results=run_results[topology],
+                                                  controller_backend=args.controller_backend,
+                                                  controller_command=args.controller_command,
+                                                  controller_shards=args.controller_shards,
+                                                  flow_check_interval=flow_check_interval,
+                                                  prometheus_base_port=args.prometheus_base_port)
                 results[topology] = success_rate
                 print(f"   Result: {success_rate}% success")
             except Exception as e:
@@ -679,6 +1138,18 @@ if __name__ == '__main__':
             status = "🏆 PERFECT" if success_rate == 100 else "✅ GOOD" if success_rate >= 90 else "❌ FAILED"
             print(f"{topology.upper():>8}: {success_rate:>6.1f}% {status}")
         
+        if args.datapath_stats:
+            print(f"\n📊 DATAPATH CACHE EFFICIENCY (pingall, {args.switches} switches x {args.hosts} hosts):")
+            print("=" * 40)
+            for topology, run in run_results.items():
+                stats = run.get('datapath', {}).get('pingall')
+                if not stats or not stats['available']:
+                    print(f"{topology.upper():>8}: unavailable")
+                    continue
+                print(f"{topology.upper():>8}: hit rate {stats['megaflow_hit_rate']:>5.1f}%, "
+                      f"upcalls {stats['upcalls']:>6}, masks {stats['masks_total']:>3}, "
+                      f"dp flows {stats['flows']:>4}")
+        
         perfect_count = sum(1 for rate in results.values() if rate == 100)
         print(f"\n🎯 Perfect Success Rate: {perfect_count}/{len(topologies)} topologies")
         
@@ -691,10 +1162,33 @@ if __name__ == '__main__':
         print(f"  Switches: {args.switches}")
         print(f"  Hosts per switch: {args.hosts}")
         print(f"  Total hosts: {total_hosts}")
+        print(f"  Controller backend: {args.controller_backend}")
+        print(f"  Controller shards: {args.controller_shards}")
         print()
         
         try:
-            universal_sdn_test(args.topology, args.switches, args.hosts, args.no_cli)
+            if args.shard_baseline:
+                print("🔬 Running single-controller baseline...")
+                baseline = {}
+                universal_sdn_test(args.topology, args.switches, args.hosts, skip_cli=True,
+                                   datapath_stats=args.datapath_stats, results=baseline,
+                                   controller_backend=args.controller_backend,
+                                   controller_command=args.controller_command,
+                                   flow_check_interval=flow_check_interval,
+                               prometheus_base_port=args.prometheus_base_port)
+                print(f"\n🔬 Running with {args.controller_shards} controller shards...")
+            
+            sharded = {}
+            universal_sdn_test(args.topology, args.switches, args.hosts, args.no_cli,
+                               datapath_stats=args.datapath_stats, results=sharded,
+                               controller_backend=args.controller_backend,
+                               controller_command=args.controller_command,
+                               controller_shards=args.controller_shards,
+                               flow_check_interval=flow_check_interval,
+                               prometheus_base_port=args.prometheus_base_port)
+            
+            if args.shard_baseline:
+                print_shard_comparison(baseline, sharded)
         except KeyboardInterrupt:
             print("\nTest interrupted by user")
             stop_faucet_controller()